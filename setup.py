@@ -0,0 +1,24 @@
+"""
+构建可选的行情解析 C 扩展 (src/_fastparse.pyx):
+
+    pip install cython
+    python setup.py build_ext --inplace
+
+生成的模块位于 src/ 下，fast_parse 会优先使用它；未构建时退回 numba 或纯 Python 实现。
+本脚本只用于就地构建扩展，服务直接从 src/ 运行，不作为发行包安装 (pip install .)。
+"""
+from setuptools import setup, Extension
+
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    cythonize = None
+
+setup(
+    name="smart-investment-mcp",
+    package_dir={"": "src"},
+    ext_modules=cythonize(
+        [Extension("_fastparse", ["src/_fastparse.pyx"])],
+        compiler_directives={"language_level": "3"},
+    ) if cythonize is not None else [],
+)
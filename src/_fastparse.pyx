@@ -0,0 +1,28 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+行情字段切分的 C 扩展实现，扫描逻辑与 fast_parse._scan 相同。
+构建: python setup.py build_ext --inplace
+"""
+
+
+cpdef list split_fields(bytes payload, unsigned char sep):
+    """
+    按 sep 切分 GBK 编码的行情串，返回各字段的 bytes 列表。
+    GBK 双字节字符的尾字节可能等于 '~' (0x7E)，遇到 >= 0x81 的首字节时连同尾字节一起跳过。
+    """
+    cdef const unsigned char* buf = payload
+    cdef Py_ssize_t size = len(payload)
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t start = 0
+    cdef list fields = []
+
+    while i < size:
+        if buf[i] >= 0x81:
+            i += 2
+            continue
+        if buf[i] == sep:
+            fields.append(payload[start:i])
+            start = i + 1
+        i += 1
+    fields.append(payload[start:size])
+    return fields
@@ -0,0 +1,296 @@
+import os
+import re
+import time
+import atexit
+import asyncio
+import logging
+from collections import OrderedDict
+from urllib.parse import urlsplit
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# 行情缓存有效期（秒），盘中建议 5~10 秒
+QUOTE_TTL_SECONDS = float(os.environ.get("QUOTE_TTL_SECONDS", "5"))
+
+# 多 worker 部署时设置 REDIS_URL（如 redis://localhost:6379/0），各进程共享行情缓存；
+# 未设置时只使用进程内缓存。需要额外安装 redis 包。
+REDIS_URL = os.environ.get("REDIS_URL")
+
+# 每个行情主机同时进行的最大请求数，避免批量查询时打满上游连接被限流
+QUOTE_CONCURRENCY = int(os.environ.get("QUOTE_CONCURRENCY", "16"))
+
+
+class QuoteClient:
+    """
+    行情接口的异步 HTTP 客户端：保持长连接复用，并按主机限制并发请求数。
+    新浪接口需要 Referer，腾讯接口忽略该头；两者都支持 gzip 压缩。
+    """
+
+    def __init__(self, concurrent_http: int = 16, timeout: float = 5.0):
+        self.concurrent_http = concurrent_http
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_keepalive_connections=2 * concurrent_http),
+            headers={"Referer": "https://finance.sina.com.cn", "Accept-Encoding": "gzip"},
+        )
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def is_closed(self) -> bool:
+        return self._client.is_closed
+
+    async def get(self, url: str) -> bytes:
+        """
+        GET 请求，返回未解码的响应字节。
+        非 2xx 响应（限流、反爬页面等）抛出 httpx.HTTPStatusError，避免错误页被当作行情缓存。
+        """
+        host = urlsplit(url).netloc
+        sem = self._semaphores.get(host)
+        if sem is None:
+            sem = self._semaphores[host] = asyncio.Semaphore(self.concurrent_http)
+        async with sem:
+            resp = await self._client.get(url)
+        resp.raise_for_status()
+        return resp.content
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+# 全局复用的客户端，避免每次调用重复 TCP 握手
+_CLIENT = QuoteClient(concurrent_http=QUOTE_CONCURRENCY)
+
+
+@atexit.register
+def _close_client() -> None:
+    """进程退出时关闭连接池"""
+    if _CLIENT.is_closed:
+        return
+    try:
+        asyncio.run(_CLIENT.aclose())
+    except Exception:
+        pass  # 事件循环已关闭时连接会随进程一起释放
+
+
+class TTLCache:
+    """
+    进程内 TTL 缓存，值为 (过期时间, 缓存对象)，通常是原始响应字节。
+    过期时间基于 time.monotonic()，不受系统时间调整影响。
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 4096):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[str, tuple[float, object]] = OrderedDict()
+
+    def get(self, key: str):
+        """命中返回缓存内容，未命中或已过期返回 None"""
+        entry = self._data.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            logger.debug("cache hit %s (hits=%d, misses=%d)", key, self.hits, self.misses)
+            return entry[1]
+        self.misses += 1
+        logger.debug("cache miss %s (hits=%d, misses=%d)", key, self.hits, self.misses)
+        return None
+
+    def remaining(self, key: str) -> float:
+        """条目剩余有效期（秒），不存在或已过期时为 0，不计入命中统计"""
+        entry = self._data.get(key)
+        return max(entry[0] - time.monotonic(), 0.0) if entry is not None else 0.0
+
+    def set(self, key: str, value, ttl: float = None) -> None:
+        """写入缓存，ttl 为空时使用默认有效期"""
+        now = time.monotonic()
+        data = self._data
+        if key in data:
+            # 刷新的条目移到末尾，按写入先后淘汰时不会误删刚更新的数据
+            data.move_to_end(key)
+        elif len(data) >= self.maxsize:
+            # 从最早写入的条目开始清理已过期的，仍然已满则淘汰最早写入的条目
+            while data and next(iter(data.values()))[0] <= now:
+                data.popitem(last=False)
+            if len(data) >= self.maxsize:
+                data.popitem(last=False)
+        data[key] = (now + (self.ttl if ttl is None else ttl), value)
+
+
+quote_cache = TTLCache(QUOTE_TTL_SECONDS)
+
+if REDIS_URL:
+    import redis.asyncio as aioredis
+    from redis.exceptions import RedisError
+    _redis = aioredis.from_url(REDIS_URL, socket_timeout=0.5)
+else:
+    _redis = None
+
+# 正在进行中的请求，同一 key 的并发未命中只发一次网络请求
+_inflight: dict[str, asyncio.Future] = {}
+
+# 批量请求的后台任务，保持引用直到结束，避免被垃圾回收
+_background_tasks: set[asyncio.Task] = set()
+
+
+async def fetch_content(url: str) -> bytes:
+    """
+    异步 GET 请求，返回未解码的响应字节（不走缓存）。
+    非 2xx 响应直接抛出，调用方只会把成功的响应写入进程内缓存和 Redis。
+    """
+    return await _CLIENT.get(url)
+
+
+async def _load_shared_many(keys: list[str]) -> dict[str, bytes]:
+    """从 Redis 读取其他 worker 缓存的响应，按剩余有效期写回进程内缓存"""
+    pipe = _redis.pipeline()
+    for key in keys:
+        pipe.get(f"quote:{key}").pttl(f"quote:{key}")
+    try:
+        replies = await pipe.execute()
+    except RedisError as e:
+        logger.warning("redis get %s failed: %s", keys, e)
+        return {}
+    found = {}
+    for key, content, ttl_ms in zip(keys, replies[::2], replies[1::2]):
+        if content is not None and ttl_ms > 0:
+            quote_cache.set(key, content, ttl=ttl_ms / 1000)
+            found[key] = content
+    return found
+
+
+async def _load_shared(key: str):
+    return (await _load_shared_many([key])).get(key)
+
+
+async def _store_shared_many(items: dict[str, bytes]) -> None:
+    """写入 Redis 供其他 worker 复用，只应传入 fetch_content 成功返回的响应"""
+    pipe = _redis.pipeline()
+    for key, content in items.items():
+        pipe.set(f"quote:{key}", content, px=int(QUOTE_TTL_SECONDS * 1000))
+    try:
+        await pipe.execute()
+    except RedisError as e:
+        logger.warning("redis set %s failed: %s", list(items), e)
+
+
+async def _store_shared(key: str, content: bytes) -> None:
+    await _store_shared_many({key: content})
+
+
+async def _load(key: str, url: str) -> bytes:
+    if _redis is not None:
+        content = await _load_shared(key)
+        if content is not None:
+            return content
+
+    content = await fetch_content(url)
+    quote_cache.set(key, content)
+    if _redis is not None:
+        await _store_shared(key, content)
+    return content
+
+
+async def _cached_fetch(key: str, url: str) -> bytes:
+    content = quote_cache.get(key)
+    if content is not None:
+        return content
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_load(key, url))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: 单个调用方被取消时不影响其他等待同一请求的调用方
+    return await asyncio.shield(task)
+
+
+async def fetch_tencent(code: str) -> bytes:
+    """获取腾讯行情原始字节 (GBK)，如 v_sh600519="1~贵州茅台~600519~..." """
+    return await _cached_fetch(code, f"http://qt.gtimg.cn/q={code}")
+
+
+# 腾讯批量响应中每个代码占一行: v_sh600519="1~贵州茅台~600519~...";
+_TENCENT_LINE_RE = re.compile(rb'v_(\w+)="[^"]*";?')
+
+
+async def _load_tencent_batch(codes: list[str], futures: dict[str, asyncio.Future]) -> None:
+    """
+    一次请求获取多个代码，按代码拆成单行写入缓存（与 fetch_tencent 的 key 相同），
+    并把结果交给各代码的等待方。未返回的代码（如代码不存在）得到空字节。
+    """
+    try:
+        found = await _load_shared_many(codes) if _redis is not None else {}
+        fetch = [code for code in codes if code not in found]
+        if fetch:
+            content = await fetch_content(f"http://qt.gtimg.cn/q={','.join(fetch)}")
+            fetched = {}
+            for m in _TENCENT_LINE_RE.finditer(content):
+                code = m.group(1).decode()
+                if code in futures and code not in found:
+                    quote_cache.set(code, m.group(0))
+                    fetched[code] = m.group(0)
+            if _redis is not None and fetched:
+                await _store_shared_many(fetched)
+            found.update(fetched)
+    except Exception as e:
+        for fut in futures.values():
+            if not fut.done():
+                fut.set_exception(e)
+        return
+    for code, fut in futures.items():
+        if not fut.done():
+            fut.set_result(found.get(code, b""))
+
+
+async def fetch_tencent_many(codes: list[str]) -> dict[str, bytes]:
+    """
+    批量获取腾讯行情原始字节，返回 {代码: 该代码的行情行}。
+    与 fetch_tencent 共用进程内缓存、进行中请求和 Redis，未命中的代码合并为一次请求。
+    """
+    contents = {}
+    pending: dict[str, asyncio.Future] = {}
+    missing = []
+    for code in dict.fromkeys(codes):
+        content = quote_cache.get(code)
+        if content is not None:
+            contents[code] = content
+        elif code in _inflight:
+            pending[code] = _inflight[code]
+        else:
+            missing.append(code)
+
+    if missing:
+        loop = asyncio.get_running_loop()
+        futures = {code: loop.create_future() for code in missing}
+        for code, fut in futures.items():
+            _inflight[code] = fut
+            fut.add_done_callback(lambda _, code=code: _inflight.pop(code, None))
+        task = asyncio.ensure_future(_load_tencent_batch(missing, futures))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+        pending.update(futures)
+
+    # shield: 单个调用方被取消时不影响其他等待同一请求的调用方
+    results = await asyncio.gather(*(asyncio.shield(fut) for fut in pending.values()))
+    contents.update(zip(pending, results))
+    return contents
+
+
+async def fetch_sina(url: str) -> bytes:
+    """获取新浪行情原始字节 (GBK)，以完整 URL 作为缓存 key"""
+    return await _cached_fetch(url, url)
+
+
+async def warmup_connections() -> None:
+    """
+    预先向两个行情接口各发一次请求，建立长连接。
+    连接池与事件循环绑定，需在服务所用的事件循环内调用。
+    """
+    for url in ("http://qt.gtimg.cn/q=sh000001", "http://hq.sinajs.cn/list=s_sh000001"):
+        try:
+            await _CLIENT.get(url)
+        except httpx.HTTPError as e:
+            logger.warning("warmup %s failed: %s", url, e)
+    logger.info("quote connections warmed up")
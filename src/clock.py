@@ -0,0 +1,13 @@
+import time
+
+# (整秒时间戳, 格式化后的 HH:MM:SS)，同一秒内的调用直接复用
+_TS_CACHE = [0, ""]
+
+
+def now_hms() -> str:
+    """当前本地时间 HH:MM:SS，按秒缓存格式化结果"""
+    t = int(time.time())
+    if t != _TS_CACHE[0]:
+        _TS_CACHE[1] = time.strftime('%H:%M:%S', time.localtime(t))
+        _TS_CACHE[0] = t
+    return _TS_CACHE[1]
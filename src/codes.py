@@ -0,0 +1,13 @@
+import functools
+
+# 首位数字 -> 交易所前缀: 6/5 开头在上交所，0/3/1 开头在深交所
+_PREFIX = {'6': 'sh', '5': 'sh', '0': 'sz', '3': 'sz', '1': 'sz'}
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize_code(symbol: str) -> str:
+    """标准化股票代码，如 600519 -> sh600519, SZ000001 -> sz000001"""
+    s = str(symbol).strip().lower()
+    if s[:2] in ('sh', 'sz'):
+        return s
+    return _PREFIX.get(s[:1], '') + s
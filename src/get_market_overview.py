@@ -1,5 +1,17 @@
-import requests
-import json
+import re
+import httpx
+import orjson
+
+# 解析: var hq_str_s_sh000001="上证指数,3000.00,-10.00,-0.33,..."
+_LINE_RE = re.compile(r'hq_str_(s_[a-z0-9]+)="([^"]*)"')
+
+ICON_UP, ICON_DOWN = "🔴", "🟢"
+
+# 模块级客户端，云函数实例复用期间保持长连接
+_CLIENT = httpx.Client(
+    timeout=5.0,
+    headers={"Referer": "https://finance.sina.com.cn", "Accept-Encoding": "gzip"},
+)
 
 def get_market_overview() -> str:
     """
@@ -9,11 +21,7 @@ def get_market_overview() -> str:
     try:
         # 新浪指数接口: s_sh000001(上证), s_sz399001(深证), s_sz399006(创业板)
         url = "http://hq.sinajs.cn/list=s_sh000001,s_sz399001,s_sz399006"
-        headers = {"Referer": "https://finance.sina.com.cn"}
-        resp = requests.get(url, headers=headers, timeout=5)
-        
-        lines = resp.text.split('\n')
-        result = "【A股大盘实时概览】\n"
+        resp = _CLIENT.get(url)
         
         index_names = {
             "s_sh000001": "上证指数",
@@ -21,24 +29,20 @@ def get_market_overview() -> str:
             "s_sz399006": "创业板指"
         }
         
-        for line in lines:
-            if len(line) < 10:
+        parts = ["【A股大盘实时概览】"]
+        for m in _LINE_RE.finditer(resp.content.decode('gbk', errors='replace')):
+            code, payload = m.group(1), m.group(2)
+            if code not in index_names:
                 continue
-            # 解析: var hq_str_s_sh000001="上证指数,3000.00,-10.00,-0.33,..."
-            try:
-                code = line.split('=')[0].split('str_')[1]
-                data = line.split('"')[1].split(',')
-                
-                if code in index_names:
-                    name = index_names[code]
-                    price = data[1]
-                    change_pct = data[3]
-                    icon = "🔴" if float(change_pct) >= 0 else "🟢"
-                    result += f"{icon} {name}: {price} ({change_pct}%)\n"
-            except Exception:
-                continue  # 忽略解析失败的行
+            fields = payload.split(',')
+            if len(fields) < 4:
+                continue  # 空数据（代码无效或接口异常），跳过该指数
+            change_pct = fields[3]
+            # 只看符号位决定红绿，无需 float 转换，停牌返回空串时也不会出错
+            icon = ICON_DOWN if change_pct.startswith('-') else ICON_UP
+            parts.append(f"{icon} {index_names[code]}: {fields[1]} ({change_pct}%)")
                 
-        return result
+        return "\n".join(parts) + "\n"
     except Exception as e:
         return f"大盘数据获取失败: {str(e)}"
 
@@ -56,7 +60,7 @@ def main(event=None, context=None) -> dict:
         "headers": {
             "Content-Type": "application/json"
         },
-        "body": json.dumps({
+        "body": orjson.dumps({
             "message": market_data
-        }, ensure_ascii=False)
+        }).decode()
     }
\ No newline at end of file
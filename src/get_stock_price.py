@@ -1,19 +1,9 @@
-import requests
-from datetime import datetime
+import httpx
+from clock import now_hms
+from codes import normalize_code
 
-def normalize_code(symbol: str) -> str:
-    """标准化股票代码格式"""
-    symbol = str(symbol).strip().upper()
-    if symbol.startswith('SH'):
-        return f'sh{symbol[2:]}'
-    elif symbol.startswith('SZ'):
-        return f'sz{symbol[2:]}'
-    elif symbol.startswith('6') or symbol.startswith('5'):
-        return f'sh{symbol}'
-    elif symbol.startswith('0') or symbol.startswith('3') or symbol.startswith('1'):
-        return f'sz{symbol}'
-    else:
-        return symbol
+# 模块级客户端，云函数实例复用期间保持长连接
+_CLIENT = httpx.Client(timeout=5.0, headers={"Accept-Encoding": "gzip"})
 
 def main(params: dict, context: dict) -> dict:
     """查询个股当前价格、涨跌幅"""
@@ -35,8 +25,8 @@ def main(params: dict, context: dict) -> dict:
         
         code = normalize_code(symbol)
         url = f"http://qt.gtimg.cn/q={code}"
-        resp = requests.get(url, timeout=5)
-        data_list = resp.text.split('"')[1].split('~')
+        resp = _CLIENT.get(url)
+        data_list = resp.content.decode('gbk', errors='replace').split('"')[1].split('~')
         
         if len(data_list) < 30:
             return {
@@ -46,15 +36,15 @@ def main(params: dict, context: dict) -> dict:
             }
         
         # 格式化消息内容
-        message_content = f"【💰 个股行情: {data_list[1]} ({code})】\n当前价格: {data_list[3]}\n今日涨跌: {data_list[32]}% ({data_list[31]})\n更新时间: {datetime.now().strftime('%H:%M:%S')}"
+        message_content = f"【💰 个股行情: {data_list[1]} ({code})】\n当前价格: {data_list[3]}\n今日涨跌: {data_list[32]}% ({data_list[31]})\n更新时间: {now_hms()}"
         
         result_data = {
-            "name": str(data_list[1]),
-            "symbol": str(code),
-            "price": str(data_list[3]),
-            "change_percent": str(data_list[32]),
-            "change_amount": str(data_list[31]),
-            "update_time": datetime.now().strftime('%H:%M:%S')
+            "name": data_list[1],
+            "symbol": code,
+            "price": data_list[3],
+            "change_percent": data_list[32],
+            "change_amount": data_list[31],
+            "update_time": now_hms()
         }
         
         return {
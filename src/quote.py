@@ -0,0 +1,130 @@
+import re
+import sys
+import asyncio
+from dataclasses import dataclass
+from cache import TTLCache, QUOTE_TTL_SECONDS, quote_cache, fetch_tencent, fetch_tencent_many
+from fast_parse import extract_fields
+
+# 腾讯数据映射: 1:名字, 3:当前价, 9~18:买一~买五(价,量), 19~28:卖一~卖五(价,量),
+# 31:涨跌额, 32:涨跌幅, 39:市盈率(TTM), 45:总市值(亿), 46:市净率(缺失时取 44)
+QUOTE_FIELDS = (1, 3, *range(9, 29), 31, 32, 39, 44, 45, 46)
+
+# 腾讯行情行: v_sh600519="1~贵州茅台~600519~..."; 代码不存在时为 v_pv_none_match="1";
+_LINE_RE = re.compile(rb'v_(\w+)="([^"]*)"')
+
+# 批量请求时每个 URL 最多合并的代码数，过长的列表会被接口截断
+BATCH_SIZE = 30
+
+
+@dataclass
+class Quote:
+    """一次腾讯行情请求解析出的个股快照，价格/基本面/盘口共用"""
+    code: str
+    name: str
+    price: str
+    change_pct: str
+    change_amt: str
+    pe: str
+    pb: str
+    mkt_cap: str
+    bid_prices: list[str]  # 买一 ~ 买五
+    bid_vols: list[int]    # 单位: 手
+    ask_prices: list[str]  # 卖一 ~ 卖五
+    ask_vols: list[int]
+
+
+_quote_cache = TTLCache(QUOTE_TTL_SECONDS)
+
+
+def _parse_vol(field: str) -> int:
+    """挂单量（手），停牌或缺失时为空串，按 0 处理"""
+    return int(field) if field.isdigit() else 0
+
+
+def parse_quote(code: str, payload: bytes):
+    """
+    解析腾讯行情引号内的数据，缺少价格字段（代码不存在等）时返回 None。
+    基本面和盘口字段缺失时为空串/0，不影响价格展示。
+    """
+    data = extract_fields(payload, QUOTE_FIELDS)
+    if 32 not in data:
+        return None
+
+    return Quote(
+        code=code,
+        name=data[1],
+        price=data[3],
+        change_pct=data[32],
+        change_amt=data[31],
+        pe=data.get(39, ""),
+        pb=data[46] if 46 in data else data.get(44, ""),  # 腾讯接口有时候位置会有微调
+        mkt_cap=data.get(45, ""),
+        bid_prices=[data.get(i, "") for i in range(9, 19, 2)],
+        bid_vols=[_parse_vol(data.get(i, "")) for i in range(10, 19, 2)],
+        ask_prices=[data.get(i, "") for i in range(19, 29, 2)],
+        ask_vols=[_parse_vol(data.get(i, "")) for i in range(20, 29, 2)],
+    )
+
+
+def _quote_from_content(code: str, content: bytes):
+    """
+    从原始响应解析行情快照并缓存。解析结果的有效期跟随原始响应的剩余有效期，
+    避免从 Redis 读到快过期的数据后又按完整 TTL 缓存。
+    """
+    m = _LINE_RE.search(content)
+    quote = parse_quote(code, m.group(2)) if m else None
+    if quote is not None:
+        _quote_cache.set(code, quote, ttl=quote_cache.remaining(code))
+    return quote
+
+
+async def fetch_quote(code: str):
+    """获取个股行情快照（TTL 内复用解析结果），未找到时返回 None"""
+    quote = _quote_cache.get(code)
+    if quote is None:
+        quote = _quote_from_content(code, await fetch_tencent(code))
+    return quote
+
+
+async def _fetch_quote_batch(codes: list[str]) -> dict[str, Quote]:
+    quotes = {}
+    for code, content in (await fetch_tencent_many(codes)).items():
+        try:
+            quote = _quote_from_content(code, content)
+        except (LookupError, ValueError):
+            continue  # 单行数据异常只跳过该代码，不影响同批其他代码
+        if quote is not None:
+            quotes[code] = quote
+    return quotes
+
+
+async def _run_all(coros: list) -> list:
+    """
+    并发执行并按顺序返回结果。Python 3.11+ 使用 TaskGroup，任一失败时取消其余任务；
+    更早的版本退回 gather。实际并发度由 QuoteClient 的按主机信号量限制。
+    """
+    if sys.version_info < (3, 11):
+        return await asyncio.gather(*coros)
+    async with asyncio.TaskGroup() as tg:
+        tasks = [tg.create_task(coro) for coro in coros]
+    return [task.result() for task in tasks]
+
+
+async def fetch_quotes(codes: list[str]) -> dict[str, Quote]:
+    """
+    批量获取个股行情快照，返回 {代码: Quote}，未找到的代码不在结果中。
+    缓存未命中的代码每 BATCH_SIZE 个合并为一次请求。
+    """
+    quotes = {}
+    missing = []
+    for code in dict.fromkeys(codes):
+        quote = _quote_cache.get(code)
+        if quote is None:
+            missing.append(code)
+        else:
+            quotes[code] = quote
+
+    batches = [missing[i:i + BATCH_SIZE] for i in range(0, len(missing), BATCH_SIZE)]
+    for result in await _run_all([_fetch_quote_batch(batch) for batch in batches]):
+        quotes.update(result)
+    return quotes
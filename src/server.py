@@ -1,168 +1,251 @@
-import requests
+import re
+import time
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
 from fastmcp import FastMCP
-from datetime import datetime
+from cache import fetch_sina, warmup_connections
+from clock import now_hms
+from codes import normalize_code
+from fast_parse import BACKEND as PARSER_BACKEND, extract_fields, warmup as warmup_parser
+from quote import Quote, fetch_quote, fetch_quotes
+
+logger = logging.getLogger(__name__)
 
 # 初始化 MCP 服务
 mcp = FastMCP("ProStockAssistant")
 
+# 新浪行情行: var hq_str_s_sh000001="上证指数,3000.00,-10.00,-0.33,..."
+_LINE_RE = re.compile(rb'hq_str_(\w+)="([^"]*)"')
+
+ICON_UP, ICON_DOWN = "🔴", "🟢"
+
 # =======================
 # 辅助函数
 # =======================
-def normalize_code(symbol: str) -> str:
-    """标准化股票代码，如 600519 -> sh600519"""
-    if symbol.startswith(('sh', 'sz')):
-        return symbol
-    if symbol.startswith(('5', '6')):
-        return f"sh{symbol}"
-    return f"sz{symbol}"
+async def get_many_quotes(codes: list[str]) -> dict[str, bytes]:
+    """
+    批量获取新浪行情，多个代码合并为一次请求。
+    返回 {代码: 逗号分隔的原始字节}，如 {"s_sh000001": b"...,3000.00,..."}
+    """
+    url = f"http://hq.sinajs.cn/list={','.join(codes)}"
+    content = await fetch_sina(url)
+    return {m.group(1).decode(): m.group(2) for m in _LINE_RE.finditer(content)}
 
 # =======================
 # 工具 1: 获取大盘指数
 # =======================
 @mcp.tool()
-def get_market_overview() -> str:
+async def get_market_overview() -> str:
     """
     获取 A 股核心大盘指数（上证、深证、创业板）的实时行情。
     用于分析整体市场情绪。
     """
     try:
         # 新浪指数接口: s_sh000001(上证), s_sz399001(深证), s_sz399006(创业板)
-        url = "http://hq.sinajs.cn/list=s_sh000001,s_sz399001,s_sz399006"
-        headers = {"Referer": "https://finance.sina.com.cn"}
-        resp = requests.get(url, headers=headers, timeout=5)
-        
-        lines = resp.text.split('\n')
-        result = "【A股大盘实时概览】\n"
-        
         index_names = {"s_sh000001": "上证指数", "s_sz399001": "深证成指", "s_sz399006": "创业板指"}
-        
-        for line in lines:
-            if len(line) < 10: continue
-            # 解析: var hq_str_s_sh000001="上证指数,3000.00,-10.00,-0.33,..."
-            code = line.split('=')[0].split('str_')[1]
-            data = line.split('"')[1].split(',')
-            
-            if code in index_names:
-                name = index_names[code]
-                price = data[1]
-                change_pct = data[3]
-                icon = "🔴" if float(change_pct) > 0 else "zz"  # 简单图示
-                if float(change_pct) < 0: icon = "🟢"
-                
-                result += f"{icon} {name}: {price} ({change_pct}%)\n"
-                
-        return result
+        quotes = await get_many_quotes(list(index_names))
+
+        parts = ["【A股大盘实时概览】"]
+        for code, payload in quotes.items():
+            if code not in index_names:
+                continue
+            # 新浪指数数据: 0:名称, 1:点位, 2:涨跌额, 3:涨跌幅
+            data = extract_fields(payload, (1, 3), sep=',')
+            if 3 not in data:
+                continue  # 空数据（代码无效或接口异常），跳过该指数
+            change_pct = data[3]
+            # 只看符号位决定红绿，无需 float 转换，停牌返回空串时也不会出错
+            icon = ICON_DOWN if change_pct.startswith('-') else ICON_UP
+            parts.append(f"{icon} {index_names[code]}: {data[1]} ({change_pct}%)")
+
+        return "\n".join(parts) + "\n"
     except Exception as e:
         return f"大盘数据获取失败: {str(e)}"
 
 # =======================
 # 工具 2: 获取个股实时价格
 # =======================
+def _format_price(quote: Quote) -> str:
+    return (
+        f"【💰 个股行情: {quote.name} ({quote.code})】\n"
+        f"当前价格: {quote.price}\n"
+        f"今日涨跌: {quote.change_pct}% ({quote.change_amt})\n"
+        f"更新时间: {now_hms()}"
+    )
+
 @mcp.tool()
-def get_stock_price(symbol: str) -> str:
+async def get_stock_price(symbol: str) -> str:
     """
     查询个股当前价格、涨跌幅。
     Args:
         symbol: 股票代码，如 "600519"
     """
-    code = normalize_code(symbol)
     try:
-        # 使用腾讯接口，解析简单
-        url = f"http://qt.gtimg.cn/q={code}"
-        resp = requests.get(url, timeout=5)
-        data = resp.text.split('"')[1].split('~')
-        
-        if len(data) < 30:
+        quote = await fetch_quote(normalize_code(symbol))
+        if quote is None:
             return "未找到该股票信息，请检查代码。"
-            
-        # 腾讯数据映射: 1:名字, 3:当前价, 31:涨跌额, 32:涨跌幅
-        return (
-            f"【💰 个股行情: {data[1]} ({code})】\n"
-            f"当前价格: {data[3]}\n"
-            f"今日涨跌: {data[32]}% ({data[31]})\n"
-            f"更新时间: {datetime.now().strftime('%H:%M:%S')}"
-        )
+        return _format_price(quote)
     except Exception as e:
         return f"查询失败: {str(e)}"
 
 # =======================
 # 工具 3: 获取个股基本面指标 (估值分析)
 # =======================
+def _format_fundamentals(quote: Quote) -> str:
+    if not quote.mkt_cap:
+        return "财务数据暂不可用。"
+    return (
+        f"【📉 基本面/估值分析: {quote.name}】\n"
+        f"市盈率 (PE-TTM): {quote.pe or 'N/A'} (衡量回本年限)\n"
+        f"市净率 (PB): {quote.pb} (衡量资产溢价)\n"
+        f"总市值: {quote.mkt_cap} 亿\n"
+        f"------------------\n"
+        f"小贴士: PE越低通常代表越便宜，但也可能意味着增长停滞。"
+    )
+
 @mcp.tool()
-def get_stock_fundamentals(symbol: str) -> str:
+async def get_stock_fundamentals(symbol: str) -> str:
     """
     获取个股的重要财务指标：市盈率(PE)、市净率(PB)、总市值。
     用于判断股票是否昂贵（估值分析）。
     Args:
         symbol: 股票代码
     """
-    code = normalize_code(symbol)
     try:
-        url = f"http://qt.gtimg.cn/q={code}"
-        resp = requests.get(url, timeout=5)
-        data = resp.text.split('"')[1].split('~')
-        
-        if len(data) < 45:
+        quote = await fetch_quote(normalize_code(symbol))
+        if quote is None:
             return "财务数据暂不可用。"
-            
-        # 腾讯数据映射: 39:市盈率(TTM), 44:市净率, 45:总市值(亿)
-        pe = data[39] if data[39] else "N/A"
-        pb = data[46] if len(data)>46 else data[44] # 腾讯接口有时候位置会有微调
-        mkt_cap = data[45]
-        
-        return (
-            f"【📉 基本面/估值分析: {data[1]}】\n"
-            f"市盈率 (PE-TTM): {pe} (衡量回本年限)\n"
-            f"市净率 (PB): {pb} (衡量资产溢价)\n"
-            f"总市值: {mkt_cap} 亿\n"
-            f"------------------\n"
-            f"小贴士: PE越低通常代表越便宜，但也可能意味着增长停滞。"
-        )
+        return _format_fundamentals(quote)
     except Exception as e:
         return f"基本面数据获取失败: {str(e)}"
 
 # =======================
 # 工具 4: 获取买卖五档盘口 (交易深度)
 # =======================
+_DEPTH_TEMPLATE = (
+    "【⚡ 交易五档盘口: {name}】\n"
+    "--------卖盘 (阻力)--------\n"
+    "卖五: {ask_prices[4]} | {ask_vols[4]}手\n"
+    "卖四: {ask_prices[3]} | {ask_vols[3]}手\n"
+    "卖三: {ask_prices[2]} | {ask_vols[2]}手\n"
+    "卖二: {ask_prices[1]} | {ask_vols[1]}手\n"
+    "卖一: {ask_prices[0]} | {ask_vols[0]}手\n"
+    "--------买盘 (支撑)--------\n"
+    "买一: {bid_prices[0]} | {bid_vols[0]}手\n"
+    "买二: {bid_prices[1]} | {bid_vols[1]}手\n"
+    "买三: {bid_prices[2]} | {bid_vols[2]}手\n"
+    "买四: {bid_prices[3]} | {bid_vols[3]}手\n"
+    "买五: {bid_prices[4]} | {bid_vols[4]}手\n"
+)
+
+def _format_depth(quote: Quote) -> str:
+    return _DEPTH_TEMPLATE.format_map(vars(quote))
+
 @mcp.tool()
-def get_trading_depth(symbol: str) -> str:
+async def get_trading_depth(symbol: str) -> str:
     """
     查看股票的买卖五档盘口（买一到买五，卖一到卖五）。
     用于分析短期资金博弈情况。
     """
-    code = normalize_code(symbol)
     try:
-        url = f"http://hq.sinajs.cn/list={code}"
-        headers = {"Referer": "https://finance.sina.com.cn"}
-        resp = requests.get(url, headers=headers, timeout=5)
-        
-        if "=\"" not in resp.text:
+        quote = await fetch_quote(normalize_code(symbol))
+        if quote is None:
             return "盘口数据获取失败。"
-            
-        # 新浪数据: 0:名 ... 10:买一量 11:买一价 ... 20:卖一量 21:卖一价 ...
-        data = resp.text.split('"')[1].split(',')
-        name = data[0]
-        
-        # 简单的格式化
-        result = f"【⚡ 交易五档盘口: {name}】\n"
-        result += "--------卖盘 (阻力)--------\n"
-        result += f"卖五: {data[29]} | {int(data[28])//100}手\n"
-        result += f"卖四: {data[27]} | {int(data[26])//100}手\n"
-        result += f"卖三: {data[25]} | {int(data[24])//100}手\n"
-        result += f"卖二: {data[23]} | {int(data[22])//100}手\n"
-        result += f"卖一: {data[21]} | {int(data[20])//100}手\n"
-        result += "--------买盘 (支撑)--------\n"
-        result += f"买一: {data[11]} | {int(data[10])//100}手\n"
-        result += f"买二: {data[13]} | {int(data[12])//100}手\n"
-        # 节省篇幅，演示显示前两档即可，或者全显示
-        
-        return result
+        return _format_depth(quote)
     except Exception as e:
         return "盘口数据不可用。"
 
+@mcp.tool()
+async def get_trading_depth_batch(symbols: list[str]) -> dict[str, str]:
+    """
+    批量查看多只股票的买卖五档盘口，适合自选股列表。
+    多个代码合并为少量请求，返回 {股票代码: 盘口文本}。
+    Args:
+        symbols: 股票代码列表，如 ["600519", "000001"]
+    """
+    codes = {symbol: normalize_code(symbol) for symbol in symbols}
+    try:
+        quotes = await fetch_quotes(list(codes.values()))
+    except Exception:
+        return {symbol: "盘口数据不可用。" for symbol in symbols}
+
+    return {
+        symbol: _format_depth(quotes[code]) if code in quotes else "盘口数据获取失败。"
+        for symbol, code in codes.items()
+    }
+
+# =======================
+# 工具 5: 个股综合看板
+# =======================
+@mcp.tool()
+async def get_stock_dashboard(symbol: str) -> str:
+    """
+    一次性获取个股行情、基本面和买卖盘口。
+    三项数据来自同一次行情请求。
+    Args:
+        symbol: 股票代码，如 "600519"
+    """
+    try:
+        quote = await fetch_quote(normalize_code(symbol))
+        if quote is None:
+            return "未找到该股票信息，请检查代码。"
+        return "\n\n".join((_format_price(quote), _format_fundamentals(quote), _format_depth(quote)))
+    except Exception as e:
+        return f"查询失败: {str(e)}"
+
+# =======================
+# 启动预热
+# =======================
+def _warmup() -> None:
+    """后台线程中完成 numba JIT 编译，首个真实请求无需再等待编译"""
+    start = time.perf_counter()
+    warmup_parser()
+    logger.info("parser (%s) warmup finished in %.0f ms", PARSER_BACKEND, (time.perf_counter() - start) * 1000)
+
+threading.Thread(target=_warmup, daemon=True).start()
+
+# =======================
+# ASGI 入口 (uvicorn 部署)
+# =======================
+# 单进程 SSE，客户端连接 /sse（百宝箱等）:
+#   uvicorn server:app --app-dir src --host 0.0.0.0 --port 8000 --loop uvloop --http httptools
+# SSE 会话保存在进程内，多个 worker 时同一会话的请求可能落到其他进程，
+# 水平扩展请改用无状态的 Streamable HTTP 入口，客户端连接 /mcp:
+#   uvicorn server:stateless_app --app-dir src --workers $(nproc) --loop uvloop --http httptools
+def _with_warmup(app):
+    """
+    在 ASGI 应用的 lifespan 中预热行情连接。每个 uvicorn worker 启动时在其服务事件循环上执行一次
+    （FastMCP 自身的 lifespan 按会话执行，无状态 HTTP 下每个请求都会触发），不阻塞启动。
+    """
+    inner = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(scope_app):
+        async with inner(scope_app) as state:
+            task = asyncio.create_task(warmup_connections())
+            try:
+                yield state
+            finally:
+                task.cancel()
+
+    app.router.lifespan_context = lifespan
+    return app
+
+app = _with_warmup(mcp.http_app(transport="sse"))
+stateless_app = _with_warmup(mcp.http_app(transport="http", stateless_http=True))
+
 if __name__ == "__main__":
+    # 有 uvloop 时用它替换默认事件循环，降低大量并发请求时的调度开销
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
     # 本地开发调试时：
-    mcp.run() 
-    
+    mcp.run()
+
     # 部署给百宝箱时 (配合 ngrok):
-    # mcp.run(transport="sse")
\ No newline at end of file
+    # mcp.run(transport="sse")